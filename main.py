@@ -1,31 +1,135 @@
+from __future__ import annotations
+
 import streamlit as st
 import os
-from PIL import Image
 from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-from google import genai
-from google.genai import types
-import pathlib
 from dotenv import load_dotenv
-import tempfile
+import io
+import math
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+    from google import genai
+    from google.genai import types
 
 # Load environment variables
 load_dotenv()
 
-# Your original create_plan_pdf function (unchanged)
-def create_plan_pdf(image_path: str, output_pdf_path: str, page_size=A4) -> bool:
+JPEG_QUALITY = 85
+EMBED_DPI = 200
+ENCODE_WORKERS = 4
+INLINE_PDF_LIMIT = 1_000_000
+# Files API objects expire after 48 hours; stop reusing a URI an hour before that
+UPLOAD_TTL_SECONDS = 47 * 3600
+BACKGROUND_WORKERS = 4
+ANALYSIS_CACHE_SIZE = 64
+PROMPT_CACHE_TTL_SECONDS = 3600
+# Gemini rejects context caches smaller than these token counts
+MIN_CACHE_TOKENS = {
+    "gemini-2.5-flash-lite": 1024,
+    "gemini-2.5-flash": 1024,
+    "gemini-2.5-pro": 4096
+}
+CHARS_PER_TOKEN = 4
+DEFAULT_MODEL = "gemini-2.5-flash"
+MODEL_OPTIONS = {
+    "flash-lite": "gemini-2.5-flash-lite",
+    "flash": "gemini-2.5-flash",
+    "pro": "gemini-2.5-pro"
+}
+# Fixed part of every request, sent as the system instruction; the editable prompt carries only the task
+SYSTEM_INSTRUCTION = """Each attached PDF was generated from a single plan image.
+
+PDF Structure Overview:
+Page 1: Full plan view.
+Page 2: Focus on the upper-left quadrant.
+Page 3: Focus on the upper-right quadrant.
+Page 4: Focus on the lower-left quadrant.
+Page 5: Focus on the lower-right quadrant."""
+# Tolerates markdown the model tends to wrap markers in, e.g. "**=== PLAN 1 ===**" or "### === PLAN 1 ==="
+PLAN_MARKER_PATTERN = re.compile(r"^[#*\s]*=+\s*PLAN\s+(\d+)\s*=+[*\s]*$", re.MULTILINE)
+
+def _render_region(image: Image.Image, box: tuple, page_size: tuple, dpi: int = EMBED_DPI) -> Image.Image:
+    from PIL import Image
+
+    # Crop and shrink in a single pass (no full-resolution intermediate) to the pixels needed
+    # to fill the page at the target DPI; never upscale
+    box_width = box[2] - box[0]
+    box_height = box[3] - box[1]
+    page_width, page_height = page_size
+    scale = min(page_width * dpi / 72 / box_width, page_height * dpi / 72 / box_height)
+    if scale >= 1:
+        return image.crop(box)
+    target_size = (max(1, round(box_width * scale)), max(1, round(box_height * scale)))
+    return image.resize(target_size, Image.LANCZOS, box=box, reducing_gap=3.0)
+
+def _encode_jpeg(image: Image.Image, quality: int = JPEG_QUALITY) -> io.BytesIO:
+    # Encode once to an in-memory JPEG so ReportLab embeds it as-is instead of re-encoding
+    buf = io.BytesIO()
+    image.save(buf, format='JPEG', quality=quality, optimize=False)
+    buf.seek(0)
+    return buf
+
+def _encode_region(image: Image.Image, box: tuple, page_size: tuple) -> io.BytesIO:
+    return _encode_jpeg(_render_region(image, box, page_size))
+
+# Builds the 5-page plan PDF (full view + four quadrants) and returns its bytes, or None on failure
+def create_plan_pdf(image_source, page_size=A4):
+    # Heavy imports are deferred to first use to keep the app's cold start fast
+    from PIL import Image
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.utils import ImageReader
+
+    # Accepts a path, a file-like object (e.g. an upload buffer) or an already opened image.
+    # Opening and decoding share one try: truncated or corrupt data only fails at load()
     try:
-        original_image = Image.open(image_path)
+        if isinstance(image_source, Image.Image):
+            original_image = image_source
+        else:
+            original_image = Image.open(image_source)
+
+        # Scale that fits the whole image on one page at the target DPI
+        page_width, page_height = page_size
+        image_width, image_height = original_image.size
+        page_scale = min(page_width * EMBED_DPI / 72 / image_width, page_height * EMBED_DPI / 72 / image_height)
+
+        if original_image.format == 'JPEG':
+            # Let libjpeg decode at a reduced scale: each quadrant fills a page, so the image only needs to
+            # fit twice the page's pixel size; scaling the request by the image's own aspect keeps the
+            # reduction from being capped by the page's orientation
+            scale = 2 * page_scale
+            if scale < 1:
+                original_image.draft('RGB', (math.ceil(image_width * scale), math.ceil(image_height * scale)))
+
+        if original_image.mode != 'RGB':
+            original_image = original_image.convert('RGB')
+        # Decode pixels up front so the encoder threads only ever read shared data
+        original_image.load()
     except FileNotFoundError:
-        print(f"Error: Input image file not found at {image_path}")
-        return False
+        print(f"Error: Input image file not found at {image_source}")
+        return None
     except Exception as e:
-        print(f"Error opening image '{image_path}': {e}")
-        return False
-
-    if original_image.mode != 'RGB':
-        original_image = original_image.convert('RGB')
+        print(f"Error reading image '{image_source}': {e}")
+        return None
+
+    # RGB JPEGs that already fit page 1 go in untouched: ReportLab embeds them with DCTDecode, so there is
+    # no re-encode. Larger ones take the downscale path, since embedding them would bloat the PDF and
+    # ReportLab decodes every ImageReader at full size to name it
+    jpeg_source = None
+    if original_image.format == 'JPEG' and page_scale >= 1 and not isinstance(image_source, Image.Image):
+        if hasattr(image_source, 'read'):
+            image_source.seek(0)
+            jpeg_source = ImageReader(io.BytesIO(image_source.read()))
+        else:
+            # A path is read straight from disk without any decode
+            jpeg_source = str(image_source)
 
     img_width, img_height = original_image.size
     quad_width = img_width // 2
@@ -38,26 +142,11 @@ def create_plan_pdf(image_path: str, output_pdf_path: str, page_size=A4) -> bool
         "lower_right": (quad_width, quad_height, img_width, img_height)
     }
 
-    c = canvas.Canvas(output_pdf_path, pagesize=page_size)
+    # Render straight into memory; callers only ever need the bytes
+    pdf_buffer = io.BytesIO()
+    c = canvas.Canvas(pdf_buffer, pagesize=page_size)
     pdf_width, pdf_height = page_size
 
-    # Page 1: Full Image
-    aspect_ratio = img_width / img_height
-    page_aspect_ratio = pdf_width / pdf_height
-    if aspect_ratio > page_aspect_ratio:
-        draw_width = pdf_width
-        draw_height = pdf_width / aspect_ratio
-    else:
-        draw_height = pdf_height
-        draw_width = pdf_height * aspect_ratio
-
-    x_offset = (pdf_width - draw_width) / 2
-    y_offset = (pdf_height - draw_height) / 2
-
-    c.drawImage(ImageReader(original_image), x_offset, y_offset, width=draw_width, height=draw_height)
-    c.drawString(40, 40, "Page 1: Full Plan Overview")
-    c.showPage()
-
     # Pages 2-5: Quadrants
     quadrant_order = ["upper_left", "upper_right", "lower_left", "lower_right"]
     quadrant_labels = {
@@ -67,64 +156,298 @@ def create_plan_pdf(image_path: str, output_pdf_path: str, page_size=A4) -> bool
         "lower_right": "Page 5: Lower-Right Quadrant Detail"
     }
 
-    for quad_key in quadrant_order:
-        cropped_quad = original_image.crop(quadrants[quad_key])
-        quad_aspect_ratio = cropped_quad.width / cropped_quad.height
-        if quad_aspect_ratio > page_aspect_ratio:
-            draw_width_quad = pdf_width
-            draw_height_quad = pdf_width / quad_aspect_ratio
-        else:
-            draw_height_quad = pdf_height
-            draw_width_quad = pdf_height * quad_aspect_ratio
-
-        x_offset_quad = (pdf_width - draw_width_quad) / 2
-        y_offset_quad = (pdf_height - draw_height_quad) / 2
-
-        c.drawImage(ImageReader(cropped_quad), x_offset_quad, y_offset_quad,
-                    width=draw_width_quad, height=draw_height_quad)
-        c.drawString(40, 40, quadrant_labels[quad_key])
+    # Pillow releases the GIL while resampling and encoding, so the five images encode in parallel
+    with ThreadPoolExecutor(max_workers=ENCODE_WORKERS) as executor:
+        page_job = None
+        if jpeg_source is None:
+            page_job = executor.submit(_encode_region, original_image, (0, 0, img_width, img_height), page_size)
+        quad_jobs = [
+            executor.submit(_encode_region, original_image, quadrants[quad_key], page_size)
+            for quad_key in quadrant_order
+        ]
+
+        # Page 1: Full Image; ReportLab fits and centres each image on the page
+        page_image = jpeg_source if page_job is None else ImageReader(page_job.result())
+        c.drawImage(page_image, 0, 0, width=pdf_width, height=pdf_height,
+                    preserveAspectRatio=True, anchor='c')
+        c.drawString(40, 40, "Page 1: Full Plan Overview")
         c.showPage()
 
-    c.save()
-    st.success(f"PDF '{output_pdf_path}' created successfully!")
-    return True
+        for quad_key, job in zip(quadrant_order, quad_jobs):
+            c.drawImage(ImageReader(job.result()), 0, 0, width=pdf_width, height=pdf_height,
+                        preserveAspectRatio=True, anchor='c')
+            c.drawString(40, 40, quadrant_labels[quad_key])
+            c.showPage()
 
-# Modified get_plan_analysis function to accept a custom prompt
-def get_plan_analysis(gemini_api_key: str, pdf_path: str, prompt_text: str) -> str:
+    c.save()
+    st.success("PDF created successfully!")
+    return pdf_buffer.getvalue()
+
+# Re-uploads and repeated clicks on the same image reuse the rendered PDF
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_pdf(image_bytes: bytes, page_size=A4):
+    return create_plan_pdf(io.BytesIO(image_bytes), page_size)
+
+# One client per API key for the whole server, so its HTTP connections are kept alive between requests
+@st.cache_resource
+def get_client(gemini_api_key: str) -> genai.Client:
+    from google import genai
+
+    return genai.Client(api_key=gemini_api_key)
+
+# Gemini uploads started while PDFs are still being built run here
+@st.cache_resource
+def _background_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS)
+
+def _upload_pdf(client, pdf_bytes: bytes) -> tuple:
+    from google.genai import types
+
+    uploaded = client.files.upload(
+        file=io.BytesIO(pdf_bytes),
+        config=types.UploadFileConfig(mime_type='application/pdf'),
+    )
+    return uploaded.uri, time.time() + UPLOAD_TTL_SECONDS
+
+def _upload_key(gemini_api_key: str, pdf_bytes: bytes) -> tuple:
+    # Uploaded files belong to the key that uploaded them
+    return hashlib.blake2b(gemini_api_key.encode("utf-8")).hexdigest(), hashlib.blake2b(pdf_bytes).hexdigest()
+
+def _upload_entry(gemini_api_key: str, pdf_bytes: bytes):
+    uploads = st.session_state.setdefault("gemini_uploads", {})
+    upload_key = _upload_key(gemini_api_key, pdf_bytes)
+    entry = uploads.get(upload_key)
+    if isinstance(entry, tuple) and time.time() > entry[1]:
+        entry = None
+    return uploads, upload_key, entry
+
+def _forget_uploads(gemini_api_key: str, pdfs: tuple) -> None:
+    uploads = st.session_state.setdefault("gemini_uploads", {})
+    for pdf_bytes in pdfs:
+        uploads.pop(_upload_key(gemini_api_key, pdf_bytes), None)
+
+def prefetch_pdf_upload(gemini_api_key: str, pdf_bytes: bytes) -> None:
+    # Start a large PDF's upload now; _pdf_part picks up the result when the analysis request is built
+    if len(pdf_bytes) <= INLINE_PDF_LIMIT:
+        return
+    uploads, upload_key, entry = _upload_entry(gemini_api_key, pdf_bytes)
+    if entry is None:
+        uploads[upload_key] = _background_executor().submit(_upload_pdf, get_client(gemini_api_key), pdf_bytes)
+
+def _pdf_part(gemini_api_key: str, pdf_bytes: bytes) -> types.Part:
+    from google.genai import types
+
+    if len(pdf_bytes) <= INLINE_PDF_LIMIT:
+        return types.Part.from_bytes(data=pdf_bytes, mime_type='application/pdf')
+
+    # Large PDFs go through the Files API once per session and are referenced by URI afterwards
+    uploads, upload_key, entry = _upload_entry(gemini_api_key, pdf_bytes)
+    if isinstance(entry, Future):
+        try:
+            entry = entry.result()
+        except Exception:
+            # Forget the failed upload so the next attempt starts a fresh one
+            uploads.pop(upload_key, None)
+            raise
+    if entry is None:
+        entry = _upload_pdf(get_client(gemini_api_key), pdf_bytes)
+    uploads[upload_key] = entry
+    return types.Part.from_uri(file_uri=entry[0], mime_type='application/pdf')
+
+def _prompt_cacheable(model: str, prompt_text: str) -> bool:
+    # Only long custom prompts can meet the model's minimum; shorter ones (including the defaults)
+    # rely on Gemini's implicit prefix caching and never cost a caches.create call
+    estimated_tokens = (len(SYSTEM_INSTRUCTION) + len(prompt_text)) // CHARS_PER_TOKEN
+    return estimated_tokens >= MIN_CACHE_TOKENS.get(model, max(MIN_CACHE_TOKENS.values()))
+
+def _delete_prompt_cache(client, cache_name: str) -> None:
+    try:
+        client.caches.delete(name=cache_name)
+    except Exception:
+        # Already expired or deleted; the TTL cleans up anything else
+        pass
+
+def _cached_prompt(gemini_api_key: str, model: str, prompt_text: str):
+    # Explicit caching is only an optimisation: any failure falls back to sending the prompt inline
+    from google.genai import errors, types
+
+    if not _prompt_cacheable(model, prompt_text):
+        return None
+    client = get_client(gemini_api_key)
+    prompt_caches = st.session_state.setdefault("gemini_prompt_caches", {})
+    # Caches belong to the key that created them
+    cache_key = (hashlib.blake2b(gemini_api_key.encode("utf-8")).hexdigest(), model,
+                 hashlib.blake2b(prompt_text.encode("utf-8")).hexdigest())
+    entry = prompt_caches.get(cache_key)
+    # Refresh a minute early so a cache never expires between lookup and use
+    if entry is None or time.time() > entry[1] - 60:
+        try:
+            cached = client.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=SYSTEM_INSTRUCTION,
+                    contents=[types.Content(role="user", parts=[types.Part(text=prompt_text)])],
+                    ttl=f"{PROMPT_CACHE_TTL_SECONDS}s",
+                ),
+            )
+            entry = (cached.name, time.time() + PROMPT_CACHE_TTL_SECONDS)
+        except errors.ClientError as e:
+            if e.code != 400:
+                return None
+            # Still below the minimum despite the estimate; remember that so it isn't retried this hour
+            entry = (None, time.time() + PROMPT_CACHE_TTL_SECONDS)
+        except Exception:
+            # Transient failures aren't remembered, so the next request tries again
+            return None
+
+    # Only the current prompt's cache is kept per (key, model); an edited prompt's old cache is deleted
+    for other_key, other_entry in list(prompt_caches.items()):
+        if other_key[:2] == cache_key[:2] and other_key != cache_key:
+            prompt_caches.pop(other_key)
+            if other_entry[0]:
+                _background_executor().submit(_delete_prompt_cache, client, other_entry[0])
+    prompt_caches[cache_key] = entry
+    return entry[0]
+
+# Shared across sessions; st.cache_data can't hold a streamed response, so finished analyses land here
+@st.cache_resource
+def _analysis_cache() -> tuple:
+    # Every session thread shares this dict, so all access goes through the lock
+    return OrderedDict(), threading.Lock()
+
+def _cached_analysis(cache_key: tuple):
+    cache, lock = _analysis_cache()
+    with lock:
+        cached_text = cache.get(cache_key)
+        if cached_text is not None:
+            cache.move_to_end(cache_key)
+        return cached_text
+
+def _store_analysis(cache_key: tuple, analysis_text: str) -> None:
+    cache, lock = _analysis_cache()
+    with lock:
+        cache[cache_key] = analysis_text
+        cache.move_to_end(cache_key)
+        while len(cache) > ANALYSIS_CACHE_SIZE:
+            cache.popitem(last=False)
+
+def _analysis_key(pdfs: tuple, prompt_text: str, model: str) -> tuple:
+    # The API key is deliberately not part of the key
+    pdf_hashes = tuple(hashlib.blake2b(pdf_bytes).hexdigest() for pdf_bytes in pdfs)
+    return model, pdf_hashes, hashlib.blake2b(prompt_text.encode("utf-8")).hexdigest()
+
+def _generate_analysis_stream(gemini_api_key: str, pdfs: tuple, prompt_text: str, model: str = DEFAULT_MODEL):
+    cache_key = _analysis_key(pdfs, prompt_text, model)
+    cached_text = _cached_analysis(cache_key)
+    if cached_text is not None:
+        yield cached_text
+        return
+
+    from google.genai import types
+
+    client = get_client(gemini_api_key)
+
+    contents = [_pdf_part(gemini_api_key, pdf_bytes) for pdf_bytes in pdfs]
+    cached_prompt_name = _cached_prompt(gemini_api_key, model, prompt_text)
+    if cached_prompt_name is None:
+        contents.append(types.Part(text=prompt_text))
+
+    chunks = []
+    try:
+        for chunk in client.models.generate_content_stream(
+            model=model,
+            contents=contents,
+            config=types.GenerateContentConfig(
+                response_modalities=["TEXT"],
+                # A cached prompt already holds the system instruction, and the API rejects setting both
+                system_instruction=SYSTEM_INSTRUCTION if cached_prompt_name is None else None,
+                cached_content=cached_prompt_name
+            ),
+        ):
+            if chunk.text:
+                chunks.append(chunk.text)
+                yield chunk.text
+    except Exception:
+        # An uploaded URI may have gone stale; drop it so the next attempt uploads again
+        _forget_uploads(gemini_api_key, pdfs)
+        raise
+
+    # Only complete, non-empty responses are cached; a failure mid-stream raises before reaching here,
+    # and an empty (e.g. safety-blocked) response must not be served to every later session
+    if chunks:
+        _store_analysis(cache_key, "".join(chunks))
+
+def _generate_analysis(gemini_api_key: str, pdfs: tuple, prompt_text: str, model: str = DEFAULT_MODEL) -> str:
+    return "".join(_generate_analysis_stream(gemini_api_key, pdfs, prompt_text, model))
+
+def _validate_analysis_inputs(gemini_api_key: str, pdfs: list, prompt_text: str):
     if not gemini_api_key:
         return "Error: Gemini API key not provided."
-    if not os.path.exists(pdf_path):
-        return f"Error: PDF file not found at {pdf_path}"
+    if not all(pdfs):
+        return "Error: PDF content is empty."
     if not prompt_text.strip():
         return "Error: Prompt text cannot be empty."
+    return None
+
+def _batch_prompt(prompt_text: str, plan_count: int) -> str:
+    return (
+        f"{prompt_text}\n\n"
+        f"The {plan_count} attached PDFs are separate plans. Apply the instructions above to each plan "
+        "independently and start each plan's output with a line of the form '=== PLAN <number> ===', "
+        "numbering the plans in the order they are attached."
+    )
+
+def _split_batch_response(response_text: str, plan_count: int):
+    parts = PLAN_MARKER_PATTERN.split(response_text)
+    sections = {int(number): body.strip() for number, body in zip(parts[1::2], parts[2::2])}
+    if sorted(sections) != list(range(1, plan_count + 1)):
+        return None
+    return [sections[number] for number in range(1, plan_count + 1)]
 
-    # Initialize client with API key
-    client = genai.Client(api_key=gemini_api_key)
-
-    filepath = pathlib.Path(pdf_path)
-    pdf_bytes = filepath.read_bytes()
-
-    contents = [
-        types.Part.from_bytes(
-            data=pdf_bytes,
-            mime_type='application/pdf',
-        ),
-        types.Part(text=prompt_text)
-    ]
+# Modified get_plan_analysis function to accept a custom prompt
+def get_plan_analysis(gemini_api_key: str, pdf_bytes: bytes, prompt_text: str, model: str = DEFAULT_MODEL) -> str:
+    error = _validate_analysis_inputs(gemini_api_key, [pdf_bytes], prompt_text)
+    if error:
+        return error
 
     with st.spinner("Analyzing plan with Gemini..."):
         try:
-            response = client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=contents,
-                config=types.GenerateContentConfig(
-                    response_modalities=["TEXT"]
-                ),
-            )
-            return response.text
+            return _generate_analysis(gemini_api_key, (pdf_bytes,), prompt_text, model)
         except Exception as e:
             return f"Error interacting with Gemini API: {e}. Check API key and model access."
 
+def stream_plan_analysis(gemini_api_key: str, pdf_bytes: bytes, prompt_text: str, model: str = DEFAULT_MODEL) -> None:
+    # Renders the analysis as it is generated instead of waiting for the full response
+    error = _validate_analysis_inputs(gemini_api_key, [pdf_bytes], prompt_text)
+    if error:
+        st.write(error)
+        return
+
+    try:
+        st.write_stream(_generate_analysis_stream(gemini_api_key, (pdf_bytes,), prompt_text, model))
+    except Exception as e:
+        st.write(f"Error interacting with Gemini API: {e}. Check API key and model access.")
+
+def get_plan_analyses(gemini_api_key: str, pdfs: list, prompt_text: str, model: str = DEFAULT_MODEL) -> list:
+    # Several plans share one request so the prompt and per-call overhead are paid once
+    if len(pdfs) == 1:
+        return [get_plan_analysis(gemini_api_key, pdfs[0], prompt_text, model)]
+    error = _validate_analysis_inputs(gemini_api_key, pdfs, prompt_text)
+    if error:
+        return [error] * len(pdfs)
+
+    with st.spinner(f"Analyzing {len(pdfs)} plans with Gemini..."):
+        try:
+            response_text = _generate_analysis(gemini_api_key, tuple(pdfs), _batch_prompt(prompt_text, len(pdfs)), model)
+        except Exception as e:
+            return [f"Error interacting with Gemini API: {e}. Check API key and model access."] * len(pdfs)
+
+    analyses = _split_batch_response(response_text, len(pdfs))
+    if analyses is None:
+        # The model ignored the plan markers; fall back to one request per plan
+        return [get_plan_analysis(gemini_api_key, pdf_bytes, prompt_text, model) for pdf_bytes in pdfs]
+    return analyses
+
 # Streamlit app
 def main():
     st.title("Plan PDF Generator and Analyzer")
@@ -145,13 +468,6 @@ def main():
     # Default prompts
     master_plan_llm_prompt_text = """As the builder of this property, your task is to generate a description of this master plan. Extract and present information from the provided PDF. Be concise, direct, and factual, adhering strictly to what is visibly presented or explicitly stated in the master plan sections, without assumptions or excessive synonyms. Utilize the detailed views from pages 2-5.I want meaning full description which is attract to buyers but do it in simple and natural language.
 
-        PDF Structure Overview:
-        Page 1: Full master plan view.
-        Page 2: Focus on the upper-left quadrant.
-        Page 3: Focus on the upper-right quadrant.
-        Page 4: Focus on the lower-left quadrant.
-        Page 5: Focus on the lower-right quadrant.
-
         Present the master plan's features by describing the following points. 
         Focus on rigorous, eye-catching details.
         Project Scope: State the total land area, number of units, and number of towers. Mention project launch and completion dates if visible.
@@ -164,13 +480,6 @@ def main():
 
     floor_plan_llm_prompt_text = """As the builder of this property, your task is to sell this floor plan. Extract and present information from the provided PDF. Be concise, direct, and factual, adhering strictly to what is visibly presented or explicitly stated in the floor plan, without assumptions or excessive synonyms. Dont mention sizes in bulletpoints. Just write simple and meaningfull sentance. I want just 3-4 bullet point in response.
 
-        PDF Structure Overview:
-        Page 1: Full floor plan view.
-        Page 2: Focus on the upper-left quadrant.
-        Page 3: Focus on the upper-right quadrant.
-        Page 4: Focus on the lower-left quadrant.
-        Page 5: Focus on the lower-right quadrant.
-        
         Write in plain English with short sentences.
         Be direct and concise.
         Use a natural, conversational tone (contractions ok; starting with ‘And/But’ is fine).
@@ -204,47 +513,57 @@ def main():
     st.write("Modify the prompt below to customize the analysis. Leave as is to use the default prompt.")
     custom_prompt = st.text_area("Analysis Prompt", value=default_prompt_text, height=300)
 
-    # Image upload
-    uploaded_file = st.file_uploader("Upload Plan Image (JPG/PNG)", type=["jpg", "png", "jpeg"])
-
-    if uploaded_file is not None:
-        # Display uploaded image
-        st.image(uploaded_file, caption="Uploaded Plan Image", use_column_width=True)
+    # Model selection: the short floor plan output doesn't need more than flash-lite
+    model_names = list(MODEL_OPTIONS)
+    default_model_name = "flash" if is_master_plan else "flash-lite"
+    model_name = st.selectbox("Model", model_names, index=model_names.index(default_model_name))
+    model = MODEL_OPTIONS[model_name]
 
-        # Create temporary files for image and PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_image:
-            tmp_image.write(uploaded_file.read())
-            image_path = tmp_image.name
+    # Image upload
+    uploaded_files = st.file_uploader("Upload Plan Images (JPG/PNG)", type=["jpg", "png", "jpeg"],
+                                      accept_multiple_files=True)
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-            output_pdf_path = tmp_pdf.name
+    if uploaded_files:
+        # Display uploaded images
+        for uploaded_file in uploaded_files:
+            st.image(uploaded_file, caption=f"Uploaded Plan Image: {uploaded_file.name}", use_column_width=True)
 
         if st.button("Generate PDF and Analyze"):
-            # Step 1: Generate PDF
-            pdf_created = create_plan_pdf(image_path, output_pdf_path, A4)
-
-            if pdf_created:
-                # Provide download link for the PDF
-                with open(output_pdf_path, "rb") as pdf_file:
+            # Step 1: Generate PDFs
+            plans = []
+            for uploaded_file in uploaded_files:
+                pdf_bytes = build_pdf(uploaded_file.getvalue(), A4)
+                if pdf_bytes is None:
+                    st.error(f"Could not create a PDF from {uploaded_file.name}.")
+                    continue
+                # Start a large PDF's upload now so it overlaps building the remaining PDFs and the page
+                # render; a lone plan whose analysis is already cached needs no upload at all
+                if len(uploaded_files) > 1 or _cached_analysis(_analysis_key((pdf_bytes,), custom_prompt, model)) is None:
+                    prefetch_pdf_upload(gemini_api_key, pdf_bytes)
+                plans.append((uploaded_file.name, pdf_bytes))
+
+            if plans:
+                # Provide download links for the PDFs
+                for index, (name, pdf_bytes) in enumerate(plans):
                     st.download_button(
-                        label="Download Generated PDF",
-                        data=pdf_file,
-                        file_name="generated_plan.pdf",
-                        mime="application/pdf"
+                        label=f"Download Generated PDF ({name})",
+                        data=pdf_bytes,
+                        file_name=f"{os.path.splitext(name)[0]}_plan.pdf",
+                        mime="application/pdf",
+                        key=f"download_pdf_{index}"
                     )
 
                 # Step 2: Get analysis with custom prompt
-                analysis_response = get_plan_analysis(gemini_api_key, output_pdf_path, custom_prompt)
-
-                # Display analysis
-                st.subheader("Plan Analysis")
-                st.write(analysis_response)
-
-            # Clean up temporary files
-            if os.path.exists(image_path):
-                os.remove(image_path)
-            if os.path.exists(output_pdf_path):
-                os.remove(output_pdf_path)
+                if len(plans) == 1:
+                    st.subheader("Plan Analysis")
+                    stream_plan_analysis(gemini_api_key, plans[0][1], custom_prompt, model)
+                else:
+                    analyses = get_plan_analyses(gemini_api_key, [pdf_bytes for _, pdf_bytes in plans], custom_prompt, model)
+
+                    # Display analysis
+                    for (name, _), analysis_response in zip(plans, analyses):
+                        st.subheader(f"Plan Analysis: {name}")
+                        st.write(analysis_response)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file